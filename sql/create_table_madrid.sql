@@ -1 +1,31 @@
-
+-- Source table for the enricher. Clustered by enrichment_status so the
+-- blocks that are fully enriched (the steady-state majority) sit apart from
+-- the pending ones and BigQuery can skip them when the fetch predicate
+-- eliminates non-null rows. To apply to the existing table:
+--   bq update --clustering_fields=enrichment_status,city rfpdata.performing_arts_madrid
+CREATE TABLE IF NOT EXISTS `rfp-database-464609.rfpdata.performing_arts_madrid` (
+  site_event_entity STRING,
+  city              STRING,
+  website           STRING,
+  category          STRING,
+  sub_category      STRING,
+  event_size_segment STRING,
+  private_public    STRING,
+  rfp               STRING,
+  enrichment_status STRING,
+  comments          STRING,
+  avg_ticket_price_source STRING,
+  capacity_source   STRING,
+  ticket_vendor_source STRING,
+  owner_fever_new   STRING,
+  contacted         STRING,
+  ticketing_with    STRING,
+  counterpart_for_ticketing_conversation STRING,
+  visitors_per_event_capacity NUMERIC,
+  avg_ticket_price  NUMERIC,
+  visitors          NUMERIC,
+  atp               NUMERIC,
+  gtv               NUMERIC,
+  last_updated      TIMESTAMP
+)
+CLUSTER BY enrichment_status, city;
@@ -0,0 +1,10 @@
+-- Append-only patch queue for BQ_WRITE_MODE=queue. Enricher instances stream
+-- patches here (insert_rows_json); /apply_patches MERGEs the latest patch per
+-- row key into performing_arts_madrid and prunes entries older than a day.
+CREATE TABLE IF NOT EXISTS `rfp-database-464609.rfpdata.performing_arts_madrid_patches` (
+  k_entity   STRING NOT NULL,
+  k_city     STRING NOT NULL,
+  k_website  STRING NOT NULL,
+  patch      STRING NOT NULL,  -- JSON object: column -> value
+  created_at TIMESTAMP NOT NULL
+);
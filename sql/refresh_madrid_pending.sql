@@ -0,0 +1,24 @@
+-- Daily scheduled query backing BQ_PENDING_TABLE. Rebuilds the small key
+-- table of rows still needing enrichment so the enricher's hot fetch joins
+-- a few hundred keys instead of scanning every target column of the main
+-- table on each batch. Schedule with:
+--   bq query --use_legacy_sql=false --schedule='every 24 hours' \
+--     --display_name=madrid_pending_refresh "$(cat sql/refresh_madrid_pending.sql)"
+-- The enricher joins these keys IFNULL-normalized, so rows whose city or
+-- website are still NULL (they are enrichment targets themselves) match too.
+CREATE OR REPLACE TABLE `rfp-database-464609.rfpdata.performing_arts_madrid_pending` AS
+SELECT site_event_entity, city, website
+FROM `rfp-database-464609.rfpdata.performing_arts_madrid`
+WHERE NOT (
+  site_event_entity IS NOT NULL AND city IS NOT NULL AND category IS NOT NULL
+  AND sub_category IS NOT NULL AND website IS NOT NULL
+  AND event_size_segment IS NOT NULL AND private_public IS NOT NULL
+  AND rfp IS NOT NULL AND enrichment_status IS NOT NULL
+  AND comments IS NOT NULL AND avg_ticket_price_source IS NOT NULL
+  AND capacity_source IS NOT NULL AND ticket_vendor_source IS NOT NULL
+  AND owner_fever_new IS NOT NULL AND contacted IS NOT NULL
+  AND ticketing_with IS NOT NULL
+  AND counterpart_for_ticketing_conversation IS NOT NULL
+  AND visitors_per_event_capacity IS NOT NULL AND avg_ticket_price IS NOT NULL
+  AND visitors IS NOT NULL AND atp IS NOT NULL AND gtv IS NOT NULL
+);
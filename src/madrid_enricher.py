@@ -1,25 +1,51 @@
 # path: src/madrid_enricher.py
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import os
+import random
+import re
 import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+import httpx
+import orjson
+from quart import Quart, jsonify, request
 from google.cloud import bigquery
 from google.api_core.exceptions import GoogleAPIError
 
-from openai import OpenAI
-from openai import APIStatusError, RateLimitError
+try:  # optional: columnar fetch via the Storage Read API
+    from google.cloud import bigquery_storage_v1
+except ImportError:
+    bigquery_storage_v1 = None  # type: ignore[assignment]
+
+from openai import AsyncOpenAI
+from openai import APIConnectionError, APIStatusError, RateLimitError
 
 PROJECT_ID = os.getenv("PROJECT_ID")
 BQ_TABLE = os.getenv("BQ_TABLE", "rfp-database-464609.rfpdata.performing_arts_madrid")
 BQ_LOCATION = os.getenv("BQ_LOCATION", "europe-southwest1")
 OAI_MODEL = os.getenv("OAI_MODEL", "gpt-4o-mini")
+OAI_MAX_CONCURRENCY = int(os.getenv("OAI_MAX_CONCURRENCY", "8"))
+OAI_RETRY_MAX = int(os.getenv("OAI_RETRY_MAX", "5"))
+OAI_PACK_SIZE = int(os.getenv("OAI_PACK_SIZE", "5"))  # rows per OpenAI request
+OAI_MAX_TOKENS = int(os.getenv("OAI_MAX_TOKENS", "512"))  # completion cap per row
+OAI_RATELIMIT_THRESHOLD = int(os.getenv("OAI_RATELIMIT_THRESHOLD", "20"))
+OAI_RPM = int(os.getenv("OAI_RPM", "0"))  # requests/min budget; 0 = no client-side pacing
+OAI_TPM = int(os.getenv("OAI_TPM", "0"))  # tokens/min budget; 0 = no client-side pacing
 LOG_PROGRESS = os.getenv("LOG_PROGRESS", "0") == "1"  # print per-row summary to logs
+BQ_STAGE_THRESHOLD = int(os.getenv("BQ_STAGE_THRESHOLD", "100"))  # rows; above this, stage + MERGE
+BQ_WRITE_MODE = os.getenv("BQ_WRITE_MODE", "auto")  # auto | inline | json | staged | queue
+BQ_FETCH_PRIORITY = os.getenv("BQ_FETCH_PRIORITY", "interactive")  # interactive | batch
+BQ_PENDING_TABLE = os.getenv("BQ_PENDING_TABLE", "")  # key side table; empty = scan main table
+BQ_PATCH_TABLE = os.getenv("BQ_PATCH_TABLE", f"{BQ_TABLE}_patches")
+BQ_META_TTL = float(os.getenv("BQ_META_TTL", "300"))  # seconds table metadata stays cached
 
 if BQ_TABLE.count(".") != 2:
     raise RuntimeError("BQ_TABLE must be fully-qualified: <project>.<dataset>.<table>")
@@ -36,10 +62,22 @@ NUMERIC_FIELDS: Tuple[str, ...] = ("visitors_per_event_capacity","avg_ticket_pri
 TIMESTAMP_FIELDS: Tuple[str, ...] = ("last_updated",)
 TARGET_FIELDS: Tuple[str, ...] = STRING_FIELDS + NUMERIC_FIELDS
 KEY_FIELDS: Tuple[str, str, str] = ("site_event_entity", "city", "website")
+# frozensets for O(1) membership tests on the per-field hot paths
+_TARGET_SET = frozenset(TARGET_FIELDS)
+_NUMERIC_SET = frozenset(NUMERIC_FIELDS)
+
+# plain int/float literals; anything else (sci-notation, junk) takes the slow path
+_NUM_RE = re.compile(r"^[-+]?\d+(?:\.\d+)?$")
 
-def _decimal_or_none(v: Any) -> Optional[Decimal]:
+def _numeric_or_none(v: Any) -> Optional[str]:
+    # Normalized literal as str: BigQuery accepts strings for NUMERIC params,
+    # so the exact digits reach the table without a Decimal/float round-trip.
     if v in (None, "", "null", "None"): return None
-    try: return Decimal(str(v).replace(",", ""))
+    if isinstance(v, Decimal): return str(v)
+    if isinstance(v, (int, float)) and not isinstance(v, bool): return str(v)
+    s = str(v).replace(",", "").strip()
+    if _NUM_RE.match(s): return s
+    try: return str(Decimal(s))
     except (InvalidOperation, ValueError, TypeError): return None
 
 def _strip_or_none(v: Any) -> Optional[str]:
@@ -57,7 +95,51 @@ def _jsonify_dict(d: Dict[str, Any]) -> Dict[str, Any]:
     return {k: _jsonify_value(v) for k, v in d.items()}
 
 def _fallback_for(field: str) -> Any:
-    return Decimal("0") if field in NUMERIC_FIELDS else ""
+    return "0" if field in _NUMERIC_SET else ""
+
+def _unknown_fields(row: Dict[str, Any]) -> List[str]:
+    return [k for k in TARGET_FIELDS if row.get(k) in (None, "")]
+
+# fields the MERGE fills by itself (or that carry no information worth an LLM call)
+_LOCAL_ONLY_FIELDS = frozenset({"enrichment_status", "comments", "last_updated"})
+
+def _needs_llm(row: Dict[str, Any]) -> bool:
+    """False when everything still missing can be filled without OpenAI."""
+    return not set(_unknown_fields(row)) <= _LOCAL_ONLY_FIELDS
+
+# gtv thresholds for event_size_segment, largest first; same vocabulary the
+# system message gives the model
+_SEGMENT_BUCKETS: Tuple[Tuple[int, str], ...] = (
+    (10**7, "Large"), (10**6, "Medium"), (0, "Small"),
+)
+
+def _rules_fill(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill fields that follow arithmetically from what the row already has,
+    mutating the row so the prompt treats them as known. Every field settled
+    here is one the model no longer has to guess (or be paid for)."""
+    vals: Dict[str, Optional[Decimal]] = {}
+    for k in ("visitors", "atp", "avg_ticket_price", "gtv"):
+        s = _numeric_or_none(row.get(k))
+        vals[k] = Decimal(s) if s is not None else None
+    derived: Dict[str, Any] = {}
+    # atp and avg_ticket_price are the same quantity under two names
+    if vals["atp"] is None and vals["avg_ticket_price"] is not None:
+        vals["atp"] = vals["avg_ticket_price"]
+        derived["atp"] = str(vals["atp"])
+    elif vals["avg_ticket_price"] is None and vals["atp"] is not None:
+        derived["avg_ticket_price"] = str(vals["atp"])
+    if vals["gtv"] is None and vals["visitors"] is not None and vals["atp"] is not None:
+        vals["gtv"] = vals["visitors"] * vals["atp"]
+        derived["gtv"] = str(vals["gtv"])
+    elif vals["visitors"] is None and vals["gtv"] is not None and vals["atp"]:
+        vals["visitors"] = (vals["gtv"] / vals["atp"]).quantize(Decimal("1"))
+        derived["visitors"] = str(vals["visitors"])
+    if row.get("event_size_segment") in (None, "") and vals["gtv"] is not None:
+        derived["event_size_segment"] = next(
+            (name for floor, name in _SEGMENT_BUCKETS if vals["gtv"] >= floor),
+            "Small")
+    row.update(derived)
+    return derived
 
 @dataclass
 class RowKey:
@@ -66,70 +148,274 @@ class RowKey:
     def from_row(cls, row: Dict[str, Any]) -> "RowKey":
         return cls(row.get("site_event_entity") or "", row.get("city") or "", row.get("website") or "")
 
-app = Flask(__name__)
+app = Quart(__name__)
 _bq_client = bigquery.Client(project=PROJECT_ID)
-_oai_client: Optional[OpenAI] = OpenAI() if os.getenv("OPENAI_API_KEY") else None
+_bq_storage = bigquery_storage_v1.BigQueryReadClient() if bigquery_storage_v1 else None
+# One long-lived transport for all OpenAI traffic: HTTP/2 multiplexes the
+# concurrent completions over a handful of connections instead of churning
+# TCP+TLS per request.
+_oai_http = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=128, max_keepalive_connections=64),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+# max_retries=0: _chat_create owns retry policy; the SDK's built-in retries
+# would stack on top of it and stretch worst-case latency.
+_oai_client: Optional[AsyncOpenAI] = (
+    AsyncOpenAI(http_client=_oai_http, max_retries=0)
+    if os.getenv("OPENAI_API_KEY") else None
+)
+
+@app.after_serving
+async def _close_oai_http() -> None:
+    await _oai_http.aclose()
+
+_RESET_RE = re.compile(r"(?:(\d+)m)?(?:([\d.]+)(m?s))?$")
+
+def _parse_reset(v: Optional[str]) -> Optional[float]:
+    # OpenAI encodes reset windows as e.g. "6m12s", "1.2s", "250ms"
+    m = _RESET_RE.match(v or "")
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    secs = float(m.group(1) or 0) * 60
+    if m.group(2):
+        secs += float(m.group(2)) * (0.001 if m.group(3) == "ms" else 1.0)
+    return secs
+
+class _HeaderThrottle:
+    """Paces dispatch from x-ratelimit-* headers instead of reacting to 429s."""
+    def __init__(self, threshold: int) -> None:
+        self.threshold = threshold
+        self.delay = 0.0
+    def observe(self, headers: Any) -> None:
+        try:
+            remaining = int(headers.get("x-ratelimit-remaining-requests", ""))
+        except (TypeError, ValueError):
+            return
+        reset = _parse_reset(headers.get("x-ratelimit-reset-requests"))
+        if remaining < self.threshold and reset:
+            self.delay = reset / max(remaining, 1)
+        else:
+            self.delay = 0.0
+    async def wait(self) -> None:
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+
+_throttle = _HeaderThrottle(OAI_RATELIMIT_THRESHOLD)
+
+class _RateBucket:
+    """Sliding-window RPM/TPM budget: sleeps only when a window is full,
+    unlike a fixed per-row sleep that wastes time well below the limit.
+    The effective RPM is AIMD-adjusted: halved on an observed 429, nudged
+    back up by 1 after 60 clean calls, bounded by the configured limit."""
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm_limit, self.tpm = rpm, tpm
+        self.rpm = rpm                       # effective, AIMD-adjusted
+        self._successes = 0
+        self._req: deque = deque()           # request timestamps, last 60s
+        self._tok: deque = deque()           # (timestamp, tokens), last 60s
+        self._tokens = 0
+    def penalize(self) -> None:
+        if self.rpm_limit > 0:
+            self.rpm = max(1, self.rpm // 2)
+            self._successes = 0
+    def reward(self) -> None:
+        if self.rpm_limit > 0 and self.rpm < self.rpm_limit:
+            self._successes += 1
+            if self._successes >= 60:
+                self.rpm += 1
+                self._successes = 0
+    def _trim(self, now: float) -> None:
+        while self._req and now - self._req[0] >= 60.0:
+            self._req.popleft()
+        while self._tok and now - self._tok[0][0] >= 60.0:
+            self._tokens -= self._tok.popleft()[1]
+    async def acquire(self, estimated_tokens: int) -> None:
+        if self.rpm_limit <= 0 and self.tpm <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._trim(now)
+            wait = 0.0
+            if self.rpm > 0 and len(self._req) >= self.rpm:
+                wait = max(wait, self._req[0] + 60.0 - now)
+            if self.tpm > 0 and self._tok and self._tokens + estimated_tokens > self.tpm:
+                wait = max(wait, self._tok[0][0] + 60.0 - now)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        self._req.append(now)
+        self._tok.append((now, estimated_tokens))
+        self._tokens += estimated_tokens
+
+_bucket = _RateBucket(OAI_RPM, OAI_TPM)
+
+def _estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    # ~4 chars/token for the prompt, plus headroom for the completion
+    return sum(len(m.get("content", "")) for m in messages) // 4 + 512
+
+def _retry_after_seconds(e: RateLimitError) -> Optional[float]:
+    try:
+        v = e.response.headers.get("retry-after")
+        return float(v) if v is not None else None
+    except (AttributeError, ValueError):
+        return None
+
+async def _chat_create(**kwargs: Any) -> Any:
+    """chat.completions.create with header-driven pacing and 429 backoff."""
+    if _oai_client is None:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    delay = 1.0
+    estimated = _estimate_tokens(kwargs.get("messages") or [])
+    for attempt in range(OAI_RETRY_MAX):
+        await _bucket.acquire(estimated)
+        await _throttle.wait()
+        try:
+            raw = await _oai_client.chat.completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            _bucket.penalize()
+            if attempt == OAI_RETRY_MAX - 1:
+                raise
+            wait = _retry_after_seconds(e)
+            if wait is None:
+                wait = delay + random.uniform(0, 1)
+                delay = min(delay * 2, 60.0)
+            await asyncio.sleep(min(wait, 60.0))
+            continue
+        except APIConnectionError:
+            # transient network failures/timeouts: same backoff, no Retry-After
+            if attempt == OAI_RETRY_MAX - 1:
+                raise
+            await asyncio.sleep(delay + random.uniform(0, 1))
+            delay = min(delay * 2, 60.0)
+            continue
+        _bucket.reward()
+        _throttle.observe(raw.headers)
+        return raw.parse()
+    raise RuntimeError("unreachable")
 
 def _null_predicate(cols: Iterable[str]) -> str:
-    return " OR ".join([f"{col} IS NULL" for col in cols])
+    # Single negated conjunction instead of a 21-way OR chain: one boolean
+    # the optimizer can push down, same rows selected.
+    return "NOT (" + " AND ".join([f"{col} IS NOT NULL" for col in cols]) + ")"
+
+# Frozen at import: identical SQL text per fetch lets BigQuery serve
+# idempotent re-reads from its result cache.
+_FETCH_SQL = f"""
+SELECT {', '.join(KEY_FIELDS + TARGET_FIELDS)}
+FROM `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}`
+WHERE {_null_predicate(TARGET_FIELDS)}
+ORDER BY last_updated IS NULL DESC, last_updated ASC
+LIMIT @limit
+"""
+
+# Pending-table path: when BQ_PENDING_TABLE names a key side table (refreshed
+# by sql/refresh_madrid_pending.sql on a daily schedule), the hot fetch joins
+# N keys instead of scanning every target column of the main table. Keys join
+# IFNULL-normalized — city and website are themselves enrichment targets, so
+# NULL key columns are common and must still match (same key semantics as the
+# MERGE write path). The null predicate stays on the joined rows so keys
+# enriched since the last refresh fall out for free.
+_FETCH_PENDING_SQL = f"""
+SELECT {', '.join(f'm.{c}' for c in KEY_FIELDS + TARGET_FIELDS)}
+FROM `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}` m
+JOIN `{BQ_PROJECT}.{BQ_DATASET}.{{pending}}` p
+  ON {' AND '.join(f"IFNULL(m.{c}, '') = IFNULL(p.{c}, '')" for c in KEY_FIELDS)}
+WHERE {_null_predicate([f'm.{c}' for c in TARGET_FIELDS])}
+ORDER BY m.last_updated IS NULL DESC, m.last_updated ASC
+LIMIT @limit
+"""
+
+_ACTIVE_FETCH_SQL = (
+    _FETCH_PENDING_SQL.format(pending=BQ_PENDING_TABLE) if BQ_PENDING_TABLE
+    else _FETCH_SQL
+)
 
 def _fetch_batch(limit: int) -> List[Dict[str, Any]]:
-    where_any_null = _null_predicate(TARGET_FIELDS)
-    sql = f"""
-    SELECT {', '.join(KEY_FIELDS + TARGET_FIELDS)}
-    FROM `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}`
-    WHERE {where_any_null}
-    ORDER BY last_updated IS NULL DESC, last_updated ASC
-    LIMIT @limit
-    """
     job = _bq_client.query(
-        sql, location=BQ_LOCATION,
+        _ACTIVE_FETCH_SQL, location=BQ_LOCATION,
         job_config=bigquery.QueryJobConfig(
+            use_query_cache=True,
+            # BATCH waits for free slots instead of competing with analytics
+            # queries; fine for a background run, but it can queue for minutes,
+            # so interactive stays the default under Cloud Run's request clock.
+            priority=(bigquery.QueryPriority.BATCH if BQ_FETCH_PRIORITY == "batch"
+                      else bigquery.QueryPriority.INTERACTIVE),
             query_parameters=[bigquery.ScalarQueryParameter("limit", "INT64", limit)]
         ),
     )
+    if _bq_storage is not None:
+        # Arrow decodes columnar batches in C; to_pylist is one call instead
+        # of a Row -> dict copy per row, and scales to much larger limits.
+        return job.to_arrow(bqstorage_client=_bq_storage).to_pylist()
     return [dict(row) for row in job]
 
-def _make_prompt(row: Dict[str, Any]) -> List[Dict[str, str]]:
+# All static prompt content (instructions, schema, field notes, examples)
+# lives in one long system message so OpenAI's automatic prefix cache can
+# discount it; the user message carries only the per-row delta.
+_SCHEMA_JSON = orjson.dumps({"strings": list(STRING_FIELDS), "numerics": list(NUMERIC_FIELDS)}).decode()
+
+_SYSTEM_MSG = (
+    "You are a careful data enricher for a Madrid performing arts dataset.\n"
+    "Each user message is compact JSON describing either one row "
+    '({"entity","city","website","known_fields","need_fields"}) or several '
+    'rows ({"rows":[...]}).\n'
+    'need_fields lists, per type, exactly the fields still missing '
+    '({"strings":[...],"numerics":[...]}). Fill every one of them so none are '
+    "null, and return exactly those keys - no others. Preserve known_fields "
+    "values exactly. Prefer EUR for prices.\n"
+    "Return ONLY compact JSON: for a single row, one object with a key per "
+    'missing field; for multiple rows, {"results":[...]} with exactly one '
+    "object per input row, in the same order.\n"
+    f"Output schema (type -> fields): {_SCHEMA_JSON}\n"
+    "Field notes: website is a full https URL; city is the municipality; "
+    "category and sub_category describe the venue or event type; "
+    "private_public is 'Private' or 'Public'; rfp and contacted are 'Yes' or "
+    "'No'; event_size_segment is one of 'Small', 'Medium', 'Large' "
+    "(Large when gtv >= 10M EUR, Medium when gtv >= 1M EUR); "
+    "avg_ticket_price and atp are EUR per ticket; visitors is annual "
+    "visitors; gtv is gross ticketing value in EUR (visitors x atp); the "
+    "*_source fields name where the figure came from.\n"
+    'Example input: {"entity":"Teatro Real","city":"Madrid","website":'
+    '"https://www.teatroreal.es","known_fields":{"category":"Theater"},'
+    '"need_fields":{"strings":["private_public"],"numerics":["avg_ticket_price"]}}\n'
+    'Example output: {"avg_ticket_price":65,"private_public":"Public"}'
+)
+
+def _row_payload(row: Dict[str, Any]) -> Dict[str, Any]:
     known_raw = {k: row.get(k) for k in TARGET_FIELDS if row.get(k) not in (None, "")}
-    known = _jsonify_dict(known_raw)
-    unknown = [k for k in TARGET_FIELDS if row.get(k) in (None, "")]
-    system = (
-        "You are a careful data enricher for a Madrid performing arts dataset. "
-        "Return ONLY compact JSON with keys for ALL missing fields. "
-        "Preserve provided values exactly. Prefer EUR for prices."
-    )
-    user = {
-        "task": "Fill all missing fields so none are null.",
+    unknown = set(_unknown_fields(row))
+    return {
         "entity": row.get("site_event_entity"),
         "city": row.get("city"),
         "website": row.get("website"),
-        "known_fields": known,
-        "need_fields": unknown,
-        "output_schema": {"strings": list(STRING_FIELDS), "numerics": list(NUMERIC_FIELDS)},
+        "known_fields": _jsonify_dict(known_raw),
+        # only the schema subset the model must fill, split by type
+        "need_fields": {"strings": [k for k in STRING_FIELDS if k in unknown],
+                        "numerics": [k for k in NUMERIC_FIELDS if k in unknown]},
     }
-    return [{"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(user)}]
 
-def _enrich_one(row: Dict[str, Any]) -> Dict[str, Any]:
-    if _oai_client is None:
-        raise RuntimeError("OPENAI_API_KEY missing")
-    unknown = [k for k in TARGET_FIELDS if row.get(k) in (None, "")]
-    resp = _oai_client.chat.completions.create(
-        model=OAI_MODEL, temperature=0.2,
-        response_format={"type": "json_object"},
-        messages=_make_prompt(row),  # type: ignore[arg-type]
-    )
-    txt = resp.choices[0].message.content or "{}"
-    data: Dict[str, Any] = json.loads(txt)
+def _make_prompt(row: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": _SYSTEM_MSG},
+            {"role": "user", "content": orjson.dumps(_row_payload(row)).decode()}]
+
+def _make_batch_prompt(rows: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    user = {"rows": [_row_payload(r) for r in rows]}
+    return [{"role": "system", "content": _SYSTEM_MSG},
+            {"role": "user", "content": orjson.dumps(user).decode()}]
+
+# column -> coercer, resolved once; per-cell dispatch is a dict hit instead of
+# a set-membership branch
+_COERCERS: Dict[str, Any] = {
+    c: (_numeric_or_none if c in _NUMERIC_SET else _strip_or_none)
+    for c in TARGET_FIELDS
+}
 
+def _patch_from_data(row: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    unknown = _unknown_fields(row)
     patch: Dict[str, Any] = {}
-    for k in STRING_FIELDS:
-        val = _strip_or_none(data.get(k))
-        if val is not None:
-            patch[k] = val
-    for k in NUMERIC_FIELDS:
-        val = _decimal_or_none(data.get(k))
+    for k in TARGET_FIELDS:
+        val = _COERCERS[k](data.get(k))
         if val is not None:
             patch[k] = val
 
@@ -139,99 +425,597 @@ def _enrich_one(row: Dict[str, Any]) -> Dict[str, Any]:
 
     return patch
 
-def _update_row(key: RowKey, patch: Dict[str, Any]) -> int:
-    # COALESCE prevents overwriting existing non-null values
-    set_parts: List[str] = [f"{col} = COALESCE({col}, @{col})" for col in patch.keys()]
-    set_parts += ["enrichment_status = 'enriched'", "last_updated = CURRENT_TIMESTAMP()"]
-    set_sql = ", ".join(set_parts) if set_parts else "enrichment_status = 'enriched', last_updated = CURRENT_TIMESTAMP()"
-
-    sql = f"""
-    UPDATE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}`
-    SET {set_sql}
-    WHERE IFNULL(site_event_entity, '') = @k_entity
-      AND IFNULL(city, '') = @k_city
-      AND IFNULL(website, '') = @k_website
-    """
-    params: List[bigquery.ScalarQueryParameter] = [
+async def _enrich_one(row: Dict[str, Any], sem: asyncio.Semaphore) -> Dict[str, Any]:
+    if _oai_client is None:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    async with sem:
+        resp = await _chat_create(
+            model=OAI_MODEL, temperature=0.2,
+            max_tokens=OAI_MAX_TOKENS,
+            response_format={"type": "json_object"},
+            messages=_make_prompt(row),
+        )
+    txt = resp.choices[0].message.content or "{}"
+    data: Dict[str, Any] = orjson.loads(txt)
+    return _patch_from_data(row, data)
+
+async def _enrich_pack(rows: List[Dict[str, Any]], sem: asyncio.Semaphore) -> List[Any]:
+    """Enrich several rows in one OpenAI request; fall back to per-row calls
+    when the model returns a misaligned result array."""
+    if _oai_client is None:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    if len(rows) == 1:
+        return [await _enrich_one(rows[0], sem)]
+    async with sem:
+        resp = await _chat_create(
+            model=OAI_MODEL, temperature=0.2,
+            max_tokens=OAI_MAX_TOKENS * len(rows),
+            response_format={"type": "json_object"},
+            messages=_make_batch_prompt(rows),
+        )
+    txt = resp.choices[0].message.content or "{}"
+    data: Dict[str, Any] = orjson.loads(txt)
+    results = data.get("results")
+    if not isinstance(results, list) or len(results) != len(rows):
+        return await asyncio.gather(*[_enrich_one(r, sem) for r in rows],
+                                    return_exceptions=True)
+    return [_patch_from_data(r, d if isinstance(d, dict) else {})
+            for r, d in zip(rows, results)]
+
+# enrichment_status is set explicitly below, so keep it out of the COALESCE list
+_MERGE_SET_COLS: Tuple[str, ...] = tuple(c for c in TARGET_FIELDS if c != "enrichment_status")
+
+# COALESCE prevents overwriting existing non-null values
+_MERGE_BODY = f"""
+ON IFNULL(T.site_event_entity, '') = S.k_entity
+  AND IFNULL(T.city, '') = S.k_city
+  AND IFNULL(T.website, '') = S.k_website
+WHEN MATCHED THEN UPDATE SET
+  {', '.join(f'{c} = COALESCE(T.{c}, S.{c})' for c in _MERGE_SET_COLS)},
+  enrichment_status = 'enriched',
+  last_updated = CURRENT_TIMESTAMP()
+"""
+
+_MERGE_SQL = f"""
+MERGE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}` T
+USING UNNEST(@patches) S
+{_MERGE_BODY}
+"""
+
+# column -> BigQuery param type, resolved once; the per-patch path only binds values
+_PARAM_TYPES: Tuple[Tuple[str, str], ...] = tuple(
+    (c, "NUMERIC" if c in _NUMERIC_SET else "STRING") for c in _MERGE_SET_COLS
+)
+
+_STAGE_SCHEMA: List[bigquery.SchemaField] = [
+    bigquery.SchemaField("k_entity", "STRING"),
+    bigquery.SchemaField("k_city", "STRING"),
+    bigquery.SchemaField("k_website", "STRING"),
+] + [bigquery.SchemaField(c, t) for c, t in _PARAM_TYPES]
+
+def _patch_struct(key: RowKey, patch: Dict[str, Any]) -> bigquery.StructQueryParameter:
+    fields: List[bigquery.ScalarQueryParameter] = [
         bigquery.ScalarQueryParameter("k_entity", "STRING", key.entity),
         bigquery.ScalarQueryParameter("k_city", "STRING", key.city or ""),
         bigquery.ScalarQueryParameter("k_website", "STRING", key.website or ""),
     ]
-    for col, val in patch.items():
-        typ = "NUMERIC" if col in NUMERIC_FIELDS else "STRING"
-        params.append(bigquery.ScalarQueryParameter(col, typ, val))
+    for col, typ in _PARAM_TYPES:
+        fields.append(bigquery.ScalarQueryParameter(col, typ, patch.get(col)))
+    return bigquery.StructQueryParameter("patch", *fields)
 
+def _merge_patches_staged(items: List[Tuple[RowKey, Dict[str, Any]]]) -> int:
+    """Bulk path for large batches: load patches into an ephemeral staging
+    table (load jobs are free and quota-friendly), MERGE once, drop it."""
+    stage_fqn = f"{BQ_PROJECT}.{BQ_DATASET}._stg_enrich_{uuid.uuid4().hex}"
+    stage_rows: List[Dict[str, Any]] = []
+    for key, patch in items:
+        row: Dict[str, Any] = {"k_entity": key.entity, "k_city": key.city or "",
+                               "k_website": key.website or ""}
+        for col in _MERGE_SET_COLS:
+            row[col] = patch.get(col)  # numerics are already normalized strings
+        stage_rows.append(row)
+    _bq_client.load_table_from_json(
+        stage_rows, stage_fqn, location=BQ_LOCATION,
+        job_config=bigquery.LoadJobConfig(schema=_STAGE_SCHEMA,
+                                          write_disposition="WRITE_TRUNCATE"),
+    ).result()
+    try:
+        job = _bq_client.query(
+            f"MERGE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}` T\nUSING `{stage_fqn}` S\n{_MERGE_BODY}",
+            location=BQ_LOCATION,
+        )
+        job.result()
+        return int(job.num_dml_affected_rows or 0)
+    finally:
+        _bq_client.delete_table(stage_fqn, not_found_ok=True)
+
+# Queue mode: DML statements count against a per-table daily quota, but
+# streaming inserts are effectively unlimited. Patches are appended to
+# BQ_PATCH_TABLE (see sql/create_table_madrid_patches.sql) and applied by
+# /apply_patches; re-application is harmless thanks to the COALESCE MERGE.
+def _queue_patches(items: List[Tuple[RowKey, Dict[str, Any]]]) -> int:
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{"k_entity": key.entity, "k_city": key.city or "",
+             "k_website": key.website or "",
+             "patch": orjson.dumps(patch).decode(), "created_at": now}
+            for key, patch in items]
+    errors = _bq_client.insert_rows_json(BQ_PATCH_TABLE, rows)
+    if errors:
+        raise GoogleAPIError(f"patch queue insert failed: {errors}")
+    return 0  # nothing applied yet; /apply_patches reports affected rows
+
+def _patch_extract(col: str, var: str = "patch") -> str:
+    expr = f"JSON_VALUE({var}, '$.{col}')"
+    return (f"CAST({expr} AS NUMERIC) AS {col}" if col in _NUMERIC_SET
+            else f"{expr} AS {col}")
+
+_APPLY_PATCHES_SQL = f"""
+MERGE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}` T
+USING (
+  SELECT k_entity, k_city, k_website,
+    {', '.join(_patch_extract(c) for c in _MERGE_SET_COLS)}
+  FROM (
+    SELECT *, ROW_NUMBER() OVER (
+      PARTITION BY k_entity, k_city, k_website ORDER BY created_at DESC) AS rn
+    FROM `{BQ_PATCH_TABLE}`
+  )
+  WHERE rn = 1
+) S
+{_MERGE_BODY}
+"""
+
+# streaming-buffer rows can't be deleted for ~90 min, so prune only old ones
+_PRUNE_PATCHES_SQL = f"""
+DELETE FROM `{BQ_PATCH_TABLE}`
+WHERE created_at < TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 1 DAY)
+"""
+
+def _apply_queued_patches() -> int:
+    job = _bq_client.query(_APPLY_PATCHES_SQL, location=BQ_LOCATION)
+    job.result()
+    affected = int(job.num_dml_affected_rows or 0)
+    _bq_client.query(_PRUNE_PATCHES_SQL, location=BQ_LOCATION).result()
+    return affected
+
+# json mode: the whole batch travels as one STRING parameter, so the query
+# never approaches BigQuery's 10,000-parameter cap no matter the batch size.
+_MERGE_JSON_SQL = f"""
+MERGE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}` T
+USING (
+  SELECT JSON_VALUE(v, '$.k_entity') AS k_entity,
+    JSON_VALUE(v, '$.k_city') AS k_city,
+    JSON_VALUE(v, '$.k_website') AS k_website,
+    {', '.join(_patch_extract(c, 'v') for c in _MERGE_SET_COLS)}
+  FROM UNNEST(JSON_EXTRACT_ARRAY(@patches)) AS v
+) S
+{_MERGE_BODY}
+"""
+
+def _merge_patches_json(items: List[Tuple[RowKey, Dict[str, Any]]]) -> int:
+    blob = orjson.dumps([
+        {"k_entity": key.entity, "k_city": key.city or "",
+         "k_website": key.website or "", **patch}
+        for key, patch in items
+    ]).decode()
+    job = _bq_client.query(
+        _MERGE_JSON_SQL, location=BQ_LOCATION,
+        job_config=bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("patches", "STRING", blob)]
+        ),
+    )
+    job.result()
+    return int(job.num_dml_affected_rows or 0)
+
+# struct-array params cost one query parameter per column per row
+_PARAMS_PER_PATCH = len(_MERGE_SET_COLS) + 3
+
+def _dedupe_items(items: List[Tuple[RowKey, Dict[str, Any]]]) -> List[Tuple[RowKey, Dict[str, Any]]]:
+    # Nothing enforces key uniqueness in the table, and MERGE rejects two
+    # source rows matching one target row. Collapse duplicates the way
+    # _APPLY_PATCHES_SQL does with ROW_NUMBER: one patch per key, first
+    # occurrence winning column-wise.
+    by_key: Dict[Tuple[str, str, str], Tuple[RowKey, Dict[str, Any]]] = {}
+    for key, patch in items:
+        k = (key.entity, key.city, key.website)
+        prev = by_key.get(k)
+        by_key[k] = (key, {**patch, **prev[1]}) if prev else (key, patch)
+    return list(by_key.values()) if len(by_key) < len(items) else items
+
+def _merge_patches(items: List[Tuple[RowKey, Dict[str, Any]]]) -> int:
+    """Apply all patches of a batch with one MERGE instead of N UPDATE jobs."""
+    if not any(p for _, p in items):
+        return 0  # nothing to write; don't spend a query job on it
+    items = _dedupe_items(items)
+    if BQ_WRITE_MODE == "queue":
+        return _queue_patches(items)
+    if BQ_WRITE_MODE == "staged" or (
+            BQ_WRITE_MODE == "auto" and len(items) >= BQ_STAGE_THRESHOLD):
+        return _merge_patches_staged(items)
+    if BQ_WRITE_MODE == "json" or (
+            BQ_WRITE_MODE == "auto" and len(items) * _PARAMS_PER_PATCH > 9000):
+        return _merge_patches_json(items)
+    params = [bigquery.ArrayQueryParameter(
+        "patches", "STRUCT", [_patch_struct(k, p) for k, p in items])]
     job = _bq_client.query(
-        sql, location=BQ_LOCATION,
+        _MERGE_SQL, location=BQ_LOCATION,
         job_config=bigquery.QueryJobConfig(query_parameters=params)
     )
     job.result()
     return int(job.num_dml_affected_rows or 0)
 
+# Table metadata, refreshed at most every BQ_META_TTL seconds: /ready used to
+# pay a full query job per probe, and metadata GETs are themselves roundtrips.
+_table_meta: Optional[bigquery.Table] = None
+_table_meta_ts = 0.0
+
+def _get_table_cached() -> bigquery.Table:
+    global _table_meta, _table_meta_ts
+    now = time.monotonic()
+    if _table_meta is None or now - _table_meta_ts >= BQ_META_TTL:
+        _table_meta = None  # a failed refresh must not leave a stale entry
+        _table_meta = _bq_client.get_table(BQ_TABLE)
+        _table_meta_ts = now
+    return _table_meta
+
 @app.get("/ping")
-def ping():
+async def ping():
     return jsonify({"ok": True})
 
 @app.get("/ready")
-def ready():
+async def ready():
     ok, errs = True, []
     try:
-        _ = _bq_client.query("SELECT 1").result()
+        await asyncio.to_thread(_get_table_cached)
     except GoogleAPIError as e:
         ok, errs = False, [f"bq:{e.__class__.__name__}"]
     if _oai_client is None:
         ok, errs = False, errs + ["openai:key_missing"]
     return (jsonify({"ok": ok, "errors": errs}), 200 if ok else 500)
 
-def _run_enrichment(batch: int, sleep: float, max_batches: int) -> Dict[str, Any]:
+# Memo of deterministic prompts: a row that failed to update keeps its NULLs
+# and would otherwise re-pay OpenAI on every later fetch of a long-lived
+# instance. Keyed by a hash of the normalized prompt payload, so any change
+# to the row's known values or missing-field set invalidates naturally.
+_PATCH_CACHE: Dict[str, Dict[str, Any]] = {}
+_PATCH_CACHE_MAX = 4096
+
+def _cache_key(row: Dict[str, Any]) -> str:
+    payload = orjson.dumps(_row_payload(row), option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def _cache_put(key: str, patch: Dict[str, Any]) -> None:
+    if len(_PATCH_CACHE) >= _PATCH_CACHE_MAX:
+        _PATCH_CACHE.pop(next(iter(_PATCH_CACHE)))  # evict oldest insertion
+    _PATCH_CACHE[key] = patch
+
+# Venues in the same city and sub-category overwhelmingly share these fields
+# (ticketing partner, contact, ownership, public/private status). Remembering
+# them per (city, sub_category) lets later rows treat them as known, shrinking
+# their prompts — and keeps the answers consistent across the dataset.
+_SHARED_FIELDS: Tuple[str, ...] = (
+    "ticketing_with", "counterpart_for_ticketing_conversation",
+    "private_public", "owner_fever_new",
+)
+_SHARED_CACHE: Dict[Tuple[str, str], Dict[str, str]] = {}
+_SHARED_CACHE_MAX = 1024
+
+def _shared_cache_key(row: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    city, sub = row.get("city"), row.get("sub_category")
+    if city in (None, "") or sub in (None, ""):
+        return None
+    return (str(city).strip().lower(), str(sub).strip().lower())
+
+def _shared_fill(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Prefill missing shared fields from earlier rows of the same
+    (city, sub_category), mutating the row; returns what it filled."""
+    key = _shared_cache_key(row)
+    hit = _SHARED_CACHE.get(key) if key is not None else None
+    if not hit:
+        return {}
+    filled = {k: v for k, v in hit.items() if row.get(k) in (None, "")}
+    row.update(filled)
+    return filled
+
+def _shared_store(row: Dict[str, Any], patch: Dict[str, Any]) -> None:
+    key = _shared_cache_key(row)
+    if key is None:
+        return
+    vals = {k: v for k in _SHARED_FIELDS
+            if (v := patch.get(k) or row.get(k)) not in (None, "")}
+    if not vals:
+        return
+    if key not in _SHARED_CACHE and len(_SHARED_CACHE) >= _SHARED_CACHE_MAX:
+        _SHARED_CACHE.pop(next(iter(_SHARED_CACHE)))
+    _SHARED_CACHE.setdefault(key, {}).update(vals)
+
+async def _gather_patches(rows: List[Dict[str, Any]], concurrency: int) -> List[Any]:
+    # Semaphore caps in-flight requests so a burst doesn't trip the rate
+    # limiter; created here so it belongs to the running event loop.
+    sem = asyncio.Semaphore(max(1, concurrency))
+    out: List[Any] = [None] * len(rows)
+    miss_idx: List[int] = []
+    for i, r in enumerate(rows):
+        hit = _PATCH_CACHE.get(_cache_key(r))
+        if hit is not None:
+            out[i] = dict(hit)
+        else:
+            miss_idx.append(i)
+    miss_rows = [rows[i] for i in miss_idx]
+    packs = [miss_rows[i:i + OAI_PACK_SIZE] for i in range(0, len(miss_rows), OAI_PACK_SIZE)]
+    # return_exceptions so one bad pack doesn't sink the whole batch
+    packed = await asyncio.gather(*[_enrich_pack(p, sem) for p in packs],
+                                  return_exceptions=True)
+    results: List[Any] = []
+    for pack, res in zip(packs, packed):
+        results.extend([res] * len(pack) if isinstance(res, BaseException) else res)
+    for i, res in zip(miss_idx, results):
+        if not isinstance(res, BaseException):
+            _cache_put(_cache_key(rows[i]), res)
+        out[i] = res
+    return out
+
+# Completes rows whose only gaps are locally-derivable fields entirely inside
+# BigQuery - no fetch, no per-row patch, no LLM. The in-loop fallback in
+# _run_enrichment_async still covers rows that race past this pass.
+_LOCAL_FILL_SQL = f"""
+UPDATE `{BQ_PROJECT}.{BQ_DATASET}.{BQ_TBL}`
+SET comments = IFNULL(comments, ''),
+    enrichment_status = 'enriched',
+    last_updated = CURRENT_TIMESTAMP()
+WHERE (enrichment_status IS NULL OR comments IS NULL)
+  AND {' AND '.join(f'{c} IS NOT NULL' for c in TARGET_FIELDS if c not in _LOCAL_ONLY_FIELDS)}
+"""
+
+def _local_fill() -> int:
+    job = _bq_client.query(_LOCAL_FILL_SQL, location=BQ_LOCATION)
+    job.result()
+    return int(job.num_dml_affected_rows or 0)
+
+def _seen_key(row: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (row.get("site_event_entity") or "", row.get("city") or "", row.get("website") or "")
+
+async def _run_enrichment_async(batch: int, sleep: float, max_batches: int,
+                                concurrency: int) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
     updated, attempted, batches = 0, 0, 0
+    seen: set = set()
+    # Write-behind: the previous batch's MERGE runs in the executor while the
+    # next batch is fetched and enriched; it is settled before the next MERGE
+    # is queued (and before returning) so counts stay accurate.
+    pending_merge: Optional[Any] = None
+    pending_count = 0
+
+    async def _settle_merge() -> None:
+        nonlocal updated, attempted, pending_merge, pending_count
+        if pending_merge is None:
+            return
+        try:
+            affected = await pending_merge
+            updated += affected
+            attempted += pending_count
+            if LOG_PROGRESS: print(f"[batch] rows={pending_count} affected={affected}")
+        except GoogleAPIError:
+            if LOG_PROGRESS: print(f"[skip:bq] batch of {pending_count}")
+            pass
+        pending_merge = None
+
+    try:
+        updated += await loop.run_in_executor(None, _local_fill)
+    except GoogleAPIError:
+        if LOG_PROGRESS: print("[skip:bq] local fill")
+        pass
+
+    # Over-fetch so the prefetched batch still holds unseen rows after the
+    # in-flight ones (whose MERGE hasn't landed yet) are filtered out.
+    fetch_limit = batch * 2
+    next_fetch = loop.run_in_executor(None, _fetch_batch, fetch_limit)
     while batches < max_batches:
-        rows = _fetch_batch(batch)
+        fetched = await next_fetch
+        rows = [r for r in fetched if _seen_key(r) not in seen][:batch]
         if not rows:
-            break
+            if fetched and seen:
+                # everything left was already handled this run; re-read now
+                # that previous merges have settled
+                fetched = await loop.run_in_executor(None, _fetch_batch, fetch_limit)
+                rows = [r for r in fetched if _seen_key(r) not in seen][:batch]
+            if not rows:
+                break
+        # kick off the next fetch so BigQuery latency hides under OpenAI work
+        next_fetch = loop.run_in_executor(None, _fetch_batch, fetch_limit)
+        seen.update(_seen_key(r) for r in rows)
+        # seed the shared-fields cache from rows that already know their
+        # ticketing metadata, then derive what arithmetic and the cache can
+        # settle before deciding who needs OpenAI; a row completed here drops
+        # out of llm_rows entirely
         for r in rows:
+            _shared_store(r, {})
+        rules = {_seen_key(r): {**_rules_fill(r), **_shared_fill(r)} for r in rows}
+        llm_rows = [r for r in rows if _needs_llm(r)]
+        # rows missing only locally-fillable fields skip OpenAI entirely
+        items: List[Tuple[RowKey, Dict[str, Any]]] = [
+            (RowKey.from_row(r),
+             {**rules[_seen_key(r)], **{k: _fallback_for(k) for k in _unknown_fields(r)}})
+            for r in rows if not _needs_llm(r)
+        ]
+        results = await _gather_patches(llm_rows, concurrency)
+        rate_limited = False
+        for r, res in zip(llm_rows, results):
             key = RowKey.from_row(r)
-            try:
-                patch = _enrich_one(r)
-            except RateLimitError:
-                return {"status":"stopped_on_rate_limit","updated":updated,"attempted":attempted,"batches":batches}
-            except APIStatusError:
+            if isinstance(res, RateLimitError):
+                rate_limited = True
+                continue
+            if isinstance(res, APIStatusError):
                 if LOG_PROGRESS: print(f"[skip:api] {key}")
                 continue
-            except Exception:
+            if isinstance(res, BaseException):
                 if LOG_PROGRESS: print(f"[skip:err] {key}")
                 continue
-            try:
-                affected = _update_row(key, patch)
-                updated += affected
-                attempted += 1
-                if LOG_PROGRESS: print(f"[row] {key} affected={affected}")
-            except GoogleAPIError:
-                if LOG_PROGRESS: print(f"[skip:bq] {key}")
-                pass
-            time.sleep(sleep)
+            # derived values win over anything the model echoed back for them
+            patch = {**res, **rules[_seen_key(r)]}
+            _shared_store(r, patch)
+            items.append((key, patch))
+        await _settle_merge()
+        pending_merge = loop.run_in_executor(None, _merge_patches, items)
+        pending_count = len(items)
+        if rate_limited:
+            await _settle_merge()
+            return {"status":"stopped_on_rate_limit","updated":updated,"attempted":attempted,"batches":batches}
         batches += 1
+        if sleep > 0:
+            await asyncio.sleep(sleep)
+    await _settle_merge()
     return {"status": "done" if batches < max_batches else "stopped_on_max_batches",
             "updated": updated, "attempted": attempted, "batch_size": batch, "batches": batches}
 
 @app.post("/enrich")
-def enrich():
+async def enrich():
     if _oai_client is None:
         return jsonify({"status":"error","error":"OPENAI_API_KEY missing"}), 500
     try:
         batch = int(request.args.get("batch","25"))
         sleep = float(request.args.get("sleep","0.15"))
         max_batches = int(request.args.get("max_batches","9999"))
+        concurrency = int(request.args.get("concurrency", str(OAI_MAX_CONCURRENCY)))
+    except Exception:
+        return jsonify({"status":"error","error":"bad query params"}), 400
+    return jsonify(await _run_enrichment_async(batch, sleep, max_batches, concurrency))
+
+# Background jobs: a long run outlives Cloud Run's request timeout, so
+# /enrich_async detaches it onto the event loop and answers 202 immediately.
+# The registry is in-process; poll /enrich_status against the same instance.
+# This relies on the deployment running min-instances=1 AND a single gunicorn
+# worker (see Dockerfile) — instance affinity alone does not give process
+# affinity, and a second worker would also split the patch/shared caches and
+# double the rate budget _RateBucket assumes.
+_JOBS: Dict[str, Dict[str, Any]] = {}
+_JOBS_MAX = 100
+
+async def _run_job(job_id: str, batch: int, sleep: float, max_batches: int,
+                   concurrency: int) -> None:
+    try:
+        result = await _run_enrichment_async(batch, sleep, max_batches, concurrency)
+        update = {"state": "done", "result": result}
+    except Exception as e:  # surfaced via /enrich_status, not a request log
+        update = {"state": "failed", "error": f"{e.__class__.__name__}: {e}"}
+    job = _JOBS.get(job_id)  # guard: the record may have been evicted meanwhile
+    if job is not None:
+        job.update(update)
+
+@app.post("/enrich_async")
+async def enrich_async():
+    if _oai_client is None:
+        return jsonify({"status":"error","error":"OPENAI_API_KEY missing"}), 500
+    try:
+        batch = int(request.args.get("batch","25"))
+        sleep = float(request.args.get("sleep","0.15"))
+        max_batches = int(request.args.get("max_batches","9999"))
+        concurrency = int(request.args.get("concurrency", str(OAI_MAX_CONCURRENCY)))
+    except Exception:
+        return jsonify({"status":"error","error":"bad query params"}), 400
+    if len(_JOBS) >= _JOBS_MAX:
+        # evict the oldest settled record; running jobs must keep their slot
+        # or their completion update would KeyError and /enrich_status would
+        # 404 a job still burning quota
+        done = next((k for k, j in _JOBS.items() if j["state"] != "running"), None)
+        if done is None:
+            return jsonify({"status":"error","error":"too many running jobs"}), 429
+        _JOBS.pop(done)
+    job_id = uuid.uuid4().hex
+    _JOBS[job_id] = {"state": "running", "started_at":
+                     datetime.now(timezone.utc).isoformat()}
+    app.add_background_task(_run_job, job_id, batch, sleep, max_batches, concurrency)
+    return jsonify({"status":"accepted","job_id":job_id}), 202
+
+@app.get("/enrich_status/<job_id>")
+async def enrich_status(job_id: str):
+    job = _JOBS.get(job_id)
+    if job is None:
+        return jsonify({"status":"error","error":"unknown job_id"}), 404
+    return jsonify({"job_id": job_id, **job})
+
+@app.post("/apply_patches")
+async def apply_patches():
+    try:
+        affected = await asyncio.to_thread(_apply_queued_patches)
+    except GoogleAPIError as e:
+        return jsonify({"status":"error","error":f"bq:{e.__class__.__name__}"}), 500
+    return jsonify({"status":"applied","updated":affected})
+
+def _batch_custom_id(row: Dict[str, Any]) -> str:
+    # custom_id is capped at 64 chars by the Batch API, so hash the row key
+    return hashlib.blake2b(orjson.dumps(_seen_key(row)), digest_size=16).hexdigest()
+
+# Offline path via the OpenAI Batch API: ~50% cheaper with separate quotas,
+# at up to 24h latency. Submit the backlog, then collect once completed.
+@app.post("/enrich_batch_submit")
+async def enrich_batch_submit():
+    if _oai_client is None:
+        return jsonify({"status":"error","error":"OPENAI_API_KEY missing"}), 500
+    try:
+        limit = int(request.args.get("limit","10000"))
+    except Exception:
+        return jsonify({"status":"error","error":"bad query params"}), 400
+    rows = [r for r in await asyncio.to_thread(_fetch_batch, limit) if _needs_llm(r)]
+    if not rows:
+        return jsonify({"status":"empty","rows":0})
+    lines = [orjson.dumps({
+        "custom_id": _batch_custom_id(r),
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {"model": OAI_MODEL, "temperature": 0.2,
+                 "response_format": {"type": "json_object"},
+                 "messages": _make_prompt(r)},
+    }) for r in rows]
+    f = await _oai_client.files.create(
+        file=("enrich_batch.jsonl", b"\n".join(lines) + b"\n"), purpose="batch")
+    job = await _oai_client.batches.create(
+        input_file_id=f.id, endpoint="/v1/chat/completions", completion_window="24h")
+    return jsonify({"status":"submitted","batch_id":job.id,"rows":len(rows)})
+
+@app.post("/enrich_batch_collect")
+async def enrich_batch_collect():
+    if _oai_client is None:
+        return jsonify({"status":"error","error":"OPENAI_API_KEY missing"}), 500
+    batch_id = request.args.get("id")
+    if not batch_id:
+        return jsonify({"status":"error","error":"missing id param"}), 400
+    try:
+        limit = int(request.args.get("limit","10000"))
     except Exception:
         return jsonify({"status":"error","error":"bad query params"}), 400
-    return jsonify(_run_enrichment(batch, sleep, max_batches))
+    job = await _oai_client.batches.retrieve(batch_id)
+    if job.status != "completed" or not job.output_file_id:
+        return jsonify({"status": job.status, "batch_id": batch_id})
+    content = await _oai_client.files.content(job.output_file_id)
+    # still-null rows are re-fetched and matched by hashed key, so collection
+    # works even on a fresh instance and never overwrites settled values
+    by_id = {_batch_custom_id(r): r for r in await asyncio.to_thread(_fetch_batch, limit)}
+    items: List[Tuple[RowKey, Dict[str, Any]]] = []
+    for line in content.text.splitlines():
+        if not line.strip():
+            continue
+        rec = orjson.loads(line)
+        row = by_id.get(rec.get("custom_id"))
+        resp = rec.get("response") or {}
+        if row is None or resp.get("status_code") != 200:
+            continue
+        try:
+            txt = resp["body"]["choices"][0]["message"]["content"] or "{}"
+            data = orjson.loads(txt)
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        items.append((RowKey.from_row(row), _patch_from_data(row, data)))
+    affected = await asyncio.to_thread(_merge_patches, items)
+    return jsonify({"status":"collected","batch_id":batch_id,
+                    "rows":len(items),"updated":affected})
 
 # EXACTLY 10 rows (10 x 1)
 @app.post("/enrich_10")
-def enrich_10():
+async def enrich_10():
     if _oai_client is None:
         return jsonify({"status":"error","error":"OPENAI_API_KEY missing"}), 500
-    return jsonify(_run_enrichment(batch=10, sleep=0.25, max_batches=1))
+    return jsonify(await _run_enrichment_async(batch=10, sleep=0.25, max_batches=1,
+                                               concurrency=OAI_MAX_CONCURRENCY))
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT","8080")), debug=False)